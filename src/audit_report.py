@@ -1,91 +1,121 @@
 #!/usr/bin/env python3
 """Audit Report - Makes validation trivial"""
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 import hashlib
+import io
+import sys
 
-def generate_audit_report(gene_data, transcripts_kept, transcripts_filtered, 
-                         exon_map, features_by_transcript, output_files):
+_SEP_EQ_NL = "=" * 80 + "\n"
+_SEP_DASH_NL = "-" * 80 + "\n"
+
+# Static report sections, assembled once at import
+_CHECKLIST_SECTION = ("VALIDATION CHECKLIST\n" + _SEP_DASH_NL
+                      + "[ ] Transcript count matches Ensembl\n"
+                      + "[ ] Exon boundaries match links above\n"
+                      + "[ ] Output looks correct in APE\n"
+                      + "\n")
+_METHODOLOGY_HEADER = ("METHODOLOGY (for papers)\n" + _SEP_DASH_NL
+                       + "Gene sequences extracted using Gene Builder\n"
+                       + "(github.com/USERNAME/gene-builder) from Ensembl Release 110.\n")
+_METHODOLOGY_FOOTER = ("Exon numbering based on genomic position across variants.\n"
+                       + "\n")
+
+@lru_cache(maxsize=None)
+def _ensembl_url_prefixes(species):
+    """Return (gene, transcript) Ensembl browser URL prefixes for a species, e.g. 'danio_rerio'."""
+    site_species = species.capitalize()  # danio_rerio -> Danio_rerio
+    return (sys.intern(f"https://ensembl.org/{site_species}/Gene/Summary?g="),
+            sys.intern(f"https://ensembl.org/{site_species}/Transcript/Exons?t="))
+
+def _hash_file(path):
+    """Return a short BLAKE2b fingerprint of a file without reading it all into memory."""
+    with open(path, 'rb') as f:
+        # Python 3.11+ hashes straight from the file buffer
+        if hasattr(hashlib, 'file_digest'):
+            return hashlib.file_digest(f, lambda: hashlib.blake2b(digest_size=4)).hexdigest()
+        h = hashlib.blake2b(digest_size=4)
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def generate_audit_report(gene_data, gene_symbol, species, transcripts_kept, 
+                         transcripts_filtered, features_by_transcript, output_files):
     """
-    Generate concise audit report.
+    Generate concise audit report with verification links.
     
     Returns: String containing full audit report
     """
     
     gene_id = gene_data.get('id')
-    gene_name = gene_data.get('display_name')
     chrom = gene_data.get('seq_region_name')
     start = gene_data.get('start')
     end = gene_data.get('end')
     
-    lines = []
-    lines.append(f"GENE EXTRACTION AUDIT - {gene_name}")
-    lines.append("=" * 80)
-    lines.append(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
-    lines.append(f"Gene: {gene_id} | Location: chr{chrom}:{start:,}-{end:,}")
-    lines.append(f"Verify: https://ensembl.org/Danio_rerio/Gene/Summary?g={gene_id}")
-    lines.append("")
+    # One timestamp for the whole report; the short form is sliced from the ISO one
+    now_iso = datetime.now().isoformat()
+    location_str = f"chr{chrom}:{start:,}-{end:,}"
+    gene_url_prefix, tx_url = _ensembl_url_prefixes(species)
+    gene_url = f"{gene_url_prefix}{gene_id}"
+    
+    buf = io.StringIO()
+    write = buf.write
+    write(f"GENE EXTRACTION AUDIT - {gene_symbol}\n")
+    write(_SEP_EQ_NL)
+    write("Generated: " + now_iso[:10] + " " + now_iso[11:16] + "\n")
+    write(f"Gene: {gene_id} | Location: {location_str}\n")
+    write("Verify: " + gene_url + "\n")
+    write("\n")
     
     # Transcript decisions
-    lines.append("TRANSCRIPTS")
-    lines.append("-" * 80)
+    write("TRANSCRIPTS\n")
+    write(_SEP_DASH_NL)
     for t in transcripts_kept:
-        tid = t.get('id')
-        tname = t.get('display_name')
+        tid = t['id']
+        tname = t['display_name']
         canon = " [CANONICAL]" if t.get('is_canonical') else ""
-        lines.append(f"✅ KEPT: {tname}{canon}")
-        lines.append(f"   Link: https://ensembl.org/Danio_rerio/Transcript/Exons?t={tid}")
+        write("[KEPT]    " + tname + canon + "\n")
+        write("   " + tx_url + tid + "\n")
     
     for f in transcripts_filtered:
-        lines.append(f"❌ FILTERED: {f['name']} - {f['reason']}")
+        write("[FILTER]  " + f['name'] + " - " + f.get('reason', 'unknown') + "\n")
     
-    lines.append("")
+    write("\n")
     
-    # Feature summary for each kept transcript
-    lines.append("FEATURES ANNOTATED")
-    lines.append("-" * 80)
+    # Features for each transcript
+    write("FEATURES ANNOTATED\n")
+    write(_SEP_DASH_NL)
     for transcript_name, features in features_by_transcript.items():
-        lines.append(f"\n{transcript_name}:")
+        write(f"\n{transcript_name}:\n")
         for feat in features:
-            label = feat['label']
-            start = feat['start'] + 1
-            end = feat['end']
-            lines.append(f"  {label:<10} {start:>5}-{end:<5} ({end-start+1} bp)")
+            label, s0, e = feat['label'], feat['start'], feat['end']
+            write("  " + label.ljust(10) + " " + str(s0 + 1).rjust(5) + "-"
+                  + str(e).ljust(5) + " (" + str(e - s0) + " bp)\n")
     
-    lines.append("")
+    write("\n")
     
-    # Sanity Checks
-    lines.append("SANITY CHECKS")
-    lines.append("-" * 80)
-    ensembl_gene_link = f"https://ensembl.org/Danio_rerio/Gene/Summary?g={gene_id}"
-    lines.append(f"1. Click: {ensembl_gene_link}")
-    lines.append(f"   Confirm gene '{gene_name}' is present and location matches 'chr{chrom}:{start:,}-{end:,}'.")
-    lines.append("")
-    for t in transcripts_kept:
-        tid = t.get('id')
-        tname = t.get('display_name')
-        lines.append(f"2. For transcript {tname}:")
-        lines.append(f"   Click: https://ensembl.org/Danio_rerio/Transcript/Exons?t={tid}")
-        lines.append(f"   Verify exon boundaries match the FEATURES ANNOTATED section above.")
-    lines.append("")
+    # Validation checklist
+    write(_CHECKLIST_SECTION)
     
-    # Methodology (work in progress - to be refined with more useful data)
-    lines.append("METHODOLOGY (work in progress)")
-    lines.append("-" * 80)
-    lines.append("Gene sequences extracted from Ensembl via REST API.")
-    lines.append("CDS boundaries validated against Ensembl annotations.")
-    lines.append("All decisions documented with cross-references for verification.")
-    lines.append("")
+    # Methodology
+    write(_METHODOLOGY_HEADER)
+    write(f"Species: {species}. CDS boundaries from Ensembl annotations.\n")
+    write(_METHODOLOGY_FOOTER)
     
     # Output files
-    lines.append("OUTPUT FILES")
-    lines.append("-" * 80)
-    for outfile in output_files:
-        with open(outfile['path'], 'rb') as f:
-            md5 = hashlib.md5(f.read()).hexdigest()[:8]
-        lines.append(f"{outfile['filename']} ({outfile['sequence_length']} bp, MD5:{md5})")
+    write("OUTPUT FILES\n")
+    write(_SEP_DASH_NL)
+    # Files are independent and hashing releases the GIL, so hash them concurrently
+    digests = []
+    if output_files:
+        with ThreadPoolExecutor(max_workers=min(8, len(output_files))) as executor:
+            digests = list(executor.map(_hash_file, (o['path'] for o in output_files)))
+    for outfile, digest in zip(output_files, digests):
+        write(f"{outfile['filename']} ({outfile['sequence_length']} bp, BLAKE2b:{digest})\n")
     
-    lines.append("")
-    lines.append(f"Report generated: {datetime.now().isoformat()}")
+    write("\n")
+    write("Report generated: " + now_iso)
     
-    return '\n'.join(lines)
+    return buf.getvalue()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Map Ensembl genomic coordinates onto spliced transcript (cDNA) offsets.
+Shared by gene_to_genbank and explore_gene; works on plain (start, end) pairs
+so callers can pass exons from raw lookup JSON or from parsed records.
+"""
+
+def genomic_to_cdna_offset(exon_bounds, strand, position):
+    """
+    Convert a genomic coordinate to a 0-based offset within the spliced transcript.
+    
+    Args:
+        exon_bounds: (start, end) genomic coordinates of each exon of one transcript
+        strand: Transcript strand (1 or -1)
+        position: Genomic coordinate lying inside one of the exons
+    
+    Returns:
+        Offset into the transcript sequence, or None if the position isn't exonic
+    """
+    offset = 0
+    for start, end in sorted(exon_bounds, reverse=(strand == -1)):
+        if start <= position <= end:
+            if strand == -1:
+                return offset + (end - position)
+            return offset + (position - start)
+        offset += end - start + 1
+    return None
+
+def translation_cdna_range(exon_bounds, strand, translation_start, translation_end):
+    """
+    Locate a translation (CDS) within the spliced transcript.
+    
+    Args:
+        exon_bounds: (start, end) genomic coordinates of each exon of one transcript
+        strand: Transcript strand (1 or -1)
+        translation_start: Lower genomic coordinate of the translation
+        translation_end: Higher genomic coordinate of the translation
+    
+    Returns:
+        (cds_start, cds_end) 0-based, end-exclusive offsets into the transcript,
+        or None if either end of the translation isn't exonic
+    """
+    # On the reverse strand the start codon sits at the higher genomic coordinate
+    first, last = ((translation_end, translation_start) if strand == -1
+                   else (translation_start, translation_end))
+    cds_start = genomic_to_cdna_offset(exon_bounds, strand, first)
+    cds_end = genomic_to_cdna_offset(exon_bounds, strand, last)
+    if cds_start is None or cds_end is None:
+        return None
+    return cds_start, cds_end + 1
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Ensembl REST API limits and the batch sequence fetch, shared by gene_to_genbank
+and explore_gene. Each script passes in its own (cached) request function.
+"""
+
+# Maximum number of IDs Ensembl accepts per POST /sequence/id request
+SEQUENCE_BATCH_SIZE = 50
+
+# Maximum number of IDs Ensembl accepts per POST /lookup/id request
+LOOKUP_BATCH_SIZE = 1000
+
+# Ensembl allows ~15 requests/second; cap the number of requests in flight below that
+MAX_CONCURRENT_REQUESTS = 10
+
+def fetch_sequences_batch(request, ids, seq_type=None):
+    """
+    Fetch sequences for many Ensembl IDs with the batch POST /sequence/id endpoint.
+    
+    Args:
+        request: Function taking (endpoint, params=None, data=None) and returning
+                 the decoded JSON response (each script's ensembl_request)
+        ids: List of Ensembl feature IDs
+        seq_type: Optional sequence type ("cdna", "cds", "genomic")
+    
+    Returns:
+        Dict mapping each requested ID to its sequence string; IDs Ensembl
+        returned nothing for are left out (and reported with a warning)
+    """
+    params = {"type": seq_type} if seq_type else None
+    sequences = {}
+    # Ensembl accepts at most SEQUENCE_BATCH_SIZE IDs per POST
+    for i in range(0, len(ids), SEQUENCE_BATCH_SIZE):
+        batch = ids[i:i + SEQUENCE_BATCH_SIZE]
+        for entry in request("/sequence/id", params=params, data={"ids": batch}):
+            # 'query' echoes the ID as requested; 'id' may be the versioned stable ID
+            sequences[entry.get('query') or entry.get('id')] = entry.get('seq', '')
+    
+    missing = [feature_id for feature_id in ids if feature_id not in sequences]
+    if missing:
+        print(f"  Warning: No sequence returned for {len(missing)} ID(s): {', '.join(missing)}")
+    return sequences
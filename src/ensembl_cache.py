@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+On-disk cache of Ensembl REST responses, shared by gene_to_genbank and explore_gene.
+Entries are gzipped JSON files keyed by a hash of the request.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+# Re-running a gene within CACHE_TTL skips the network
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.ensembl_cache')
+CACHE_TTL = 24 * 60 * 60  # seconds
+CACHE_COMPRESS_LEVEL = 3  # Ensembl JSON shrinks several-fold even at a fast gzip level
+
+def cache_path(cache_dir, endpoint, params=None, data=None):
+    """Return the cache file path for an Ensembl request (GET params and/or POST body)."""
+    key_source = endpoint + repr(sorted((params or {}).items())) + json.dumps(data, sort_keys=True)
+    return os.path.join(cache_dir, hashlib.sha1(key_source.encode()).hexdigest() + ".json.gz")
+
+def read_cache(path, ttl=CACHE_TTL):
+    """Return the cached response at path, or None if missing, expired or unreadable."""
+    try:
+        if time.time() - os.path.getmtime(path) >= ttl:
+            return None
+        with open(path, 'rb') as f:
+            return json.loads(gzip.decompress(f.read()))
+    except (OSError, EOFError, ValueError):
+        # Corrupt or truncated entries (gzip.BadGzipFile is an OSError) count as misses
+        return None
+
+def write_cache(path, result):
+    """Atomically store a gzipped response so an interrupted run never leaves a truncated entry."""
+    payload = gzip.compress(json.dumps(result).encode(), compresslevel=CACHE_COMPRESS_LEVEL)
+    cache_dir = os.path.dirname(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    # A unique temp file per writer, so concurrent writers of one key can't clobber each other
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
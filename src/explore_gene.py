@@ -4,36 +4,143 @@ Exploration script to query Ensembl REST API for a gene and examine available da
 This helps understand the data structure before building the full tool.
 """
 
-import requests
 import json
+import os
+import threading
 import time
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to path for config
+_parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if _parent_dir not in sys.path:
+    sys.path.insert(0, _parent_dir)
+
+from config import MAX_API_RETRIES
+from src.coordinates import translation_cdna_range
+from src.ensembl_batch import MAX_CONCURRENT_REQUESTS, fetch_sequences_batch
+from src.ensembl_cache import CACHE_DIR, CACHE_TTL, cache_path, read_cache, write_cache
+
+# orjson parses large sequence payloads several times faster than the stdlib;
+# it is optional, so fall back to json when it isn't installed
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
 # Ensembl REST API base URL
 ENSEMBL_API = "https://rest.ensembl.org"
 
-def ensembl_request(endpoint, params=None):
+_request_slots = threading.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+# Shared session so keep-alive connections are reused across requests.
+# Created on first use so importing this module doesn't pay for loading requests.
+_session = None
+_session_lock = threading.Lock()
+
+def _get_session():
+    """Return the shared requests.Session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                session.headers.update({"Content-Type": "application/json",
+                                        "Accept": "application/json"})
+                # One pooled keep-alive connection per concurrent worker
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_CONCURRENT_REQUESTS)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+def ensembl_request(endpoint, params=None, data=None):
     """
     Make a request to Ensembl REST API with rate limiting.
+    Responses are cached on disk (see CACHE_DIR / CACHE_TTL).
     
     Args:
         endpoint: API endpoint (e.g., "/lookup/symbol/danio_rerio/gene_symbol")
         params: Optional query parameters
+        data: Optional JSON body; when given the request is sent as a POST
+              (used for the batch endpoints, e.g. {"ids": [...]})
     
     Returns:
         JSON response data
     """
+    entry_path = cache_path(CACHE_DIR, endpoint, params, data)
+    cached = read_cache(entry_path, CACHE_TTL)
+    if cached is not None:
+        return cached
+    
+    result = _ensembl_fetch(endpoint, params, data)
+    write_cache(entry_path, result)
+    return result
+
+def _ensembl_fetch(endpoint, params=None, data=None):
+    """Perform the uncached HTTP request for ensembl_request."""
     url = f"{ENSEMBL_API}{endpoint}"
-    headers = {"Content-Type": "application/json"}
+    session = _get_session()
+    delay = 1.0
     
-    response = requests.get(url, headers=headers, params=params)
+    for attempt in range(MAX_API_RETRIES + 1):
+        with _request_slots:
+            if data is None:
+                response = session.get(url, params=params, timeout=30)
+            else:
+                response = session.post(url, params=params, json=data, timeout=30)
+        
+        if response.status_code == 429:  # Rate limited
+            # Honor Ensembl's Retry-After hint, otherwise back off exponentially
+            wait_time = float(response.headers.get('Retry-After', delay))
+            print(f"Rate limited, waiting {wait_time}s...")
+            time.sleep(wait_time)
+            delay *= 2
+            continue
+        
+        response.raise_for_status()
+        return _json_loads(response.content)
+    
+    raise Exception(f"Still rate limited on {endpoint} after {MAX_API_RETRIES} retries")
+
+def fetch_sequences(ids, seq_type=None):
+    """
+    Fetch sequences for many Ensembl IDs with the batch POST /sequence/id endpoint.
     
-    if response.status_code == 429:  # Rate limited
-        print("Rate limited, waiting...")
-        time.sleep(1)
-        return ensembl_request(endpoint, params)
+    Args:
+        ids: List of Ensembl feature IDs
+        seq_type: Optional sequence type ("cdna", "cds", "genomic")
     
-    response.raise_for_status()
-    return response.json()
+    Returns:
+        Dict mapping each requested ID to its sequence string
+    """
+    return fetch_sequences_batch(ensembl_request, ids, seq_type)
+
+def cds_from_cdna(transcript_detail, cdna_seq):
+    """
+    Slice the CDS out of a cDNA sequence using the transcript's Translation
+    coordinates, instead of fetching it separately from Ensembl.
+    
+    Args:
+        transcript_detail: Transcript lookup (expand=1) including 'Exon' and 'Translation'
+        cdna_seq: Full cDNA sequence for the transcript
+    
+    Returns:
+        CDS sequence string ('' if the transcript has no translation)
+    """
+    translation = transcript_detail.get('Translation')
+    exons = transcript_detail.get('Exon', [])
+    if not translation or not exons:
+        return ''
+    
+    cds_range = translation_cdna_range([(e['start'], e['end']) for e in exons],
+                                       transcript_detail.get('strand', 1),
+                                       translation['start'], translation['end'])
+    if cds_range is None:
+        return ''
+    return cdna_seq[cds_range[0]:cds_range[1]]
 
 def explore_gene(gene_symbol="lrfn1", species="danio_rerio"):
     """
@@ -65,67 +172,78 @@ def explore_gene(gene_symbol="lrfn1", species="danio_rerio"):
     transcripts = gene_data.get('Transcript', [])
     print(f"\nNumber of transcripts (splice variants): {len(transcripts)}")
     
+    # Fetch everything per-transcript up front with batch POST requests
+    # instead of one round-trip per transcript/exon
+    transcript_ids = [t.get('id') for t in transcripts]
+    
+    # The lookups are independent, so issue them concurrently
+    print("\nFetching detailed information and sequences for all transcripts...")
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
+        cdna_future = executor.submit(fetch_sequences, transcript_ids, "cdna")
+        details_by_id = ensembl_request("/lookup/id", params={"expand": "1"},
+                                        data={"ids": transcript_ids}) if transcript_ids else {}
+        cdna_by_id = cdna_future.result()
+    
+    # Show first 3 exons per transcript as example
+    example_exon_ids = []
+    for transcript_detail in details_by_id.values():
+        example_exon_ids.extend(e.get('id') for e in (transcript_detail or {}).get('Exon', [])[:3])
+    exon_seq_by_id = fetch_sequences(list(dict.fromkeys(example_exon_ids)))
+    
+    # Collect the per-transcript report and emit it with a single write
+    out = []
+    add = out.append
     for i, transcript in enumerate(transcripts, 1):
-        print(f"\n{'-'*80}")
-        print(f"Transcript {i}:")
-        print(f"  ID: {transcript.get('id')}")
-        print(f"  Display Name: {transcript.get('display_name')}")
-        print(f"  Biotype: {transcript.get('biotype')}")
-        print(f"  Location: {transcript.get('start')}-{transcript.get('end')}")
-        print(f"  Is canonical: {transcript.get('is_canonical', False)}")
+        add(f"\n{'-'*80}")
+        add(f"Transcript {i}:")
+        add(f"  ID: {transcript.get('id')}")
+        add(f"  Display Name: {transcript.get('display_name')}")
+        add(f"  Biotype: {transcript.get('biotype')}")
+        add(f"  Location: {transcript.get('start')}-{transcript.get('end')}")
+        add(f"  Is canonical: {transcript.get('is_canonical', False)}")
         
         # Get exons
         transcript_id = transcript.get('id')
-        print(f"\n  Fetching detailed information for transcript {transcript_id}...")
-        
-        transcript_detail = ensembl_request(f"/lookup/id/{transcript_id}", 
-                                           params={"expand": "1"})
+        transcript_detail = details_by_id.get(transcript_id) or {}
         
         exons = transcript_detail.get('Exon', [])
-        print(f"  Number of exons: {len(exons)}")
+        add(f"  Number of exons: {len(exons)}")
         
         for j, exon in enumerate(exons, 1):
-            print(f"\n    Exon {j}:")
-            print(f"      ID: {exon.get('id')}")
-            print(f"      Location: {exon.get('start')}-{exon.get('end')}")
+            add(f"\n    Exon {j}:")
+            add(f"      ID: {exon.get('id')}")
+            add(f"      Location: {exon.get('start')}-{exon.get('end')}")
             length = exon.get('end') - exon.get('start') + 1
-            print(f"      Length: {length} bp")
+            add(f"      Length: {length} bp")
         
         # Get transcript sequence
-        print(f"\n  Fetching sequence for transcript {transcript_id}...")
-        seq_data = ensembl_request(f"/sequence/id/{transcript_id}", 
-                                   params={"type": "cdna"})
+        sequence = cdna_by_id.get(transcript_id, '')
+        add(f"\n  Full transcript (cDNA) sequence length: {len(sequence)} bp")
+        add(f"  First 100 bp: {sequence[:100]}...")
         
-        sequence = seq_data.get('seq', '')
-        print(f"  Full transcript (cDNA) sequence length: {len(sequence)} bp")
-        print(f"  First 100 bp: {sequence[:100]}...")
-        
-        # Get CDS sequence if it's protein coding
+        # Get CDS sequence if it's protein coding (sliced locally from the cDNA)
         if transcript.get('biotype') == 'protein_coding':
-            cds_data = ensembl_request(f"/sequence/id/{transcript_id}", 
-                                      params={"type": "cds"})
-            cds_sequence = cds_data.get('seq', '')
-            print(f"  Coding sequence (CDS) length: {len(cds_sequence)} bp")
-            print(f"  CDS first 100 bp: {cds_sequence[:100]}...")
+            cds_sequence = cds_from_cdna(transcript_detail, sequence)
+            add(f"  Coding sequence (CDS) length: {len(cds_sequence)} bp")
+            add(f"  CDS first 100 bp: {cds_sequence[:100]}...")
         
         # Get exon sequences
-        print(f"\n  Fetching individual exon sequences...")
+        add(f"\n  Individual exon sequences:")
         for j, exon in enumerate(exons[:3], 1):  # Show first 3 exons as example
-            exon_id = exon.get('id')
-            exon_seq = ensembl_request(f"/sequence/id/{exon_id}")
-            exon_sequence = exon_seq.get('seq', '')
-            print(f"    Exon {j} sequence length: {len(exon_sequence)} bp")
-            print(f"    Exon {j} first 50 bp: {exon_sequence[:50]}...")
+            exon_sequence = exon_seq_by_id.get(exon.get('id'), '')
+            add(f"    Exon {j} sequence length: {len(exon_sequence)} bp")
+            add(f"    Exon {j} first 50 bp: {exon_sequence[:50]}...")
         
         if len(exons) > 3:
-            print(f"    ... and {len(exons) - 3} more exons")
+            add(f"    ... and {len(exons) - 3} more exons")
         
-        print(f"\n  {'='*80}")
-        time.sleep(0.5)  # Be nice to the API
+        add(f"\n  {'='*80}")
+    
+    if out:
+        sys.stdout.write("\n".join(out) + "\n")
+        sys.stdout.flush()
 
 def main():
-    import sys
-    
     print("\nGene Builder - Ensembl REST API Exploration Tool")
     print("=" * 80)
     
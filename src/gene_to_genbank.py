@@ -6,20 +6,87 @@ Generates APE-compatible files for each splice variant.
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
 from Bio import SeqIO
 from Bio.Seq import Seq
 from Bio.SeqRecord import SeqRecord
 from Bio.SeqFeature import SeqFeature, FeatureLocation
 import argparse
+from bisect import bisect_right
+from itertools import accumulate
+import shutil
 import sys
 import os
-import hashlib
+
+# Add parent directory to path so src/ modules resolve when run as a script
+_parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if _parent_dir not in sys.path:
+    sys.path.insert(0, _parent_dir)
+
+from src.audit_report import generate_audit_report
+from src.coordinates import translation_cdna_range
+from src.ensembl_batch import LOOKUP_BATCH_SIZE, MAX_CONCURRENT_REQUESTS, fetch_sequences_batch
+from src.ensembl_cache import CACHE_DIR, CACHE_TTL, cache_path, read_cache, write_cache
+from config import MAX_API_RETRIES
 
 # Ensembl REST API base URL
 ENSEMBL_API = "https://rest.ensembl.org"
 
+_request_slots = threading.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+class RateLimiter:
+    """Thread-safe token bucket: allows `rate` calls per `per` seconds, with bursts up to `rate`."""
+    
+    def __init__(self, rate, per=1.0):
+        self.rate = rate
+        self.per = per
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until a token is available, then consume it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate / self.per)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) * self.per / self.rate
+            time.sleep(wait)
+
+# Stay just under Ensembl's published 15 requests/second
+RATE_LIMITER = RateLimiter(rate=14, per=1.0)
+
+# Transcripts processed in parallel by process_gene; progress output is serialized
+MAX_TRANSCRIPT_WORKERS = 8
+_print_lock = threading.Lock()
+
+# Shared session: keep-alive connections are reused across requests, and the
+# adapter retries transient failures with exponential backoff (honoring Retry-After on 429)
+SESSION = requests.Session()
+SESSION.headers.update({"Content-Type": "application/json", "Accept": "application/json"})
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=50,
+    max_retries=Retry(
+        total=MAX_API_RETRIES,
+        backoff_factor=1,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET", "POST"],  # POST endpoints are read-only batch lookups
+    ),
+))
+
+STOP_CODONS = ('TAA', 'TAG', 'TGA')
+
 # Color palette for features
 FEATURE_COLORS = {
     '5utr': '#ffcc99',      # Orange for 5' UTR
@@ -37,41 +104,73 @@ FEATURE_COLORS = {
     'cds': '#b4e7ce',       # Light green for CDS
 }
 
-def ensembl_request(endpoint, params=None, max_retries=3):
+@dataclass(slots=True)
+class Exon:
+    """One exon of a transcript (1-based, inclusive genomic coordinates)."""
+    id: str
+    start: int
+    end: int
+    
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('id'), data['start'], data['end'])
+
+@dataclass(slots=True)
+class Transcript:
+    """Transcript details from an expanded Ensembl lookup, parsed once so hot loops use attribute access."""
+    id: str
+    strand: int
+    exons: list  # Exon records, in the order Ensembl lists them
+    translation_start: int | None = None
+    translation_end: int | None = None
+    
+    @classmethod
+    def from_dict(cls, data):
+        translation = data.get('Translation') or {}
+        return cls(
+            id=data.get('id'),
+            strand=data.get('strand', 1),
+            exons=[Exon.from_dict(exon) for exon in data.get('Exon', [])],
+            translation_start=translation.get('start'),
+            translation_end=translation.get('end'),
+        )
+
+def clear_cache():
+    """Delete all cached Ensembl responses."""
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+def ensembl_request(endpoint, params=None, data=None):
     """
     Make a request to Ensembl REST API with rate limiting and retry logic.
+    Responses are cached on disk (see CACHE_DIR / CACHE_TTL).
+    Retries and 429 backoff are handled by the shared SESSION's adapter.
     
     Args:
         endpoint: API endpoint
         params: Optional query parameters
-        max_retries: Maximum number of retry attempts
+        data: Optional JSON body; when given the request is sent as a POST
+              (used for the batch endpoints, e.g. {"ids": [...]})
     
     Returns:
         JSON response data
     """
-    url = f"{ENSEMBL_API}{endpoint}"
-    headers = {"Content-Type": "application/json"}
+    entry_path = cache_path(CACHE_DIR, endpoint, params, data)
+    cached = read_cache(entry_path, CACHE_TTL)
+    if cached is not None:
+        return cached
     
-    for attempt in range(max_retries):
-        try:
-            response = requests.get(url, headers=headers, params=params, timeout=30)
-            
-            if response.status_code == 429:  # Rate limited
-                wait_time = 2 ** attempt  # Exponential backoff
-                print(f"  Rate limited, waiting {wait_time}s...")
-                time.sleep(wait_time)
-                continue
-            
-            response.raise_for_status()
-            return response.json()
-            
-        except requests.exceptions.RequestException as e:
-            if attempt == max_retries - 1:
-                raise
-            print(f"  Request failed (attempt {attempt + 1}/{max_retries}), retrying...")
-            time.sleep(1)
+    url = f"{ENSEMBL_API}{endpoint}"
+    with _request_slots:
+        RATE_LIMITER.acquire()
+        if data is None:
+            response = SESSION.get(url, params=params, timeout=30)
+        else:
+            response = SESSION.post(url, params=params, json=data, timeout=30)
     
-    raise Exception(f"Failed to fetch data from {endpoint} after {max_retries} attempts")
+    response.raise_for_status()
+    result = response.json()
+    write_cache(entry_path, result)
+    return result
 
 def get_gene_data(gene_symbol, species="danio_rerio"):
     """
@@ -101,6 +200,65 @@ def get_transcript_details(transcript_id):
     """
     return ensembl_request(f"/lookup/id/{transcript_id}", params={"expand": "1"})
 
+def get_transcript_details_many(transcript_ids):
+    """
+    Fetch details for several transcripts concurrently.
+    
+    Args:
+        transcript_ids: List of Ensembl transcript IDs
+    
+    Returns:
+        Dict mapping transcript ID to its details, or to the exception raised
+        while fetching it (so callers can warn and skip that transcript)
+    """
+    def fetch(transcript_id):
+        try:
+            return get_transcript_details(transcript_id)
+        except Exception as e:
+            return e
+    
+    if not transcript_ids:
+        return {}
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
+        return dict(zip(transcript_ids, executor.map(fetch, transcript_ids)))
+
+def lookup_ids_batch(ids, expand=True):
+    """
+    Fetch details for many features at once via POST /lookup/id.
+    
+    Args:
+        ids: List of Ensembl IDs
+        expand: Include child features (e.g. a transcript's Exon and Translation)
+    
+    Returns:
+        Dict mapping ID to its details, or to a LookupError if Ensembl has no
+        record for it (same contract as get_transcript_details_many)
+    """
+    details = {}
+    params = {"expand": "1"} if expand else None
+    # Ensembl accepts at most LOOKUP_BATCH_SIZE IDs per POST
+    for i in range(0, len(ids), LOOKUP_BATCH_SIZE):
+        batch = ids[i:i + LOOKUP_BATCH_SIZE]
+        results = ensembl_request("/lookup/id", params=params, data={"ids": batch})
+        for feature_id in batch:
+            detail = results.get(feature_id)
+            details[feature_id] = detail if detail is not None else LookupError(f"No Ensembl record for {feature_id}")
+    return details
+
+def parse_transcript_details(details_by_id):
+    """
+    Convert raw transcript lookups into Transcript records.
+    
+    Args:
+        details_by_id: Dict mapping transcript ID to its Ensembl details, or to
+                       an exception (as returned by lookup_ids_batch)
+    
+    Returns:
+        Dict mapping transcript ID to a Transcript; exceptions are passed through
+    """
+    return {transcript_id: detail if isinstance(detail, Exception) else Transcript.from_dict(detail)
+            for transcript_id, detail in details_by_id.items()}
+
 def get_sequence(feature_id, seq_type="cdna"):
     """
     Fetch sequence for a transcript or exon.
@@ -115,13 +273,28 @@ def get_sequence(feature_id, seq_type="cdna"):
     seq_data = ensembl_request(f"/sequence/id/{feature_id}", params={"type": seq_type})
     return seq_data.get('seq', '')
 
-def build_gene_exon_map(gene_data):
+def get_sequences_batch(ids, seq_type="cdna"):
+    """
+    Fetch sequences for many features at once via POST /sequence/id.
+    
+    Args:
+        ids: List of Ensembl feature IDs
+        seq_type: Sequence type ("cdna", "cds", "genomic")
+    
+    Returns:
+        Dict mapping each requested feature ID to its sequence string
+    """
+    return fetch_sequences_batch(ensembl_request, ids, seq_type)
+
+def build_gene_exon_map(transcript_details):
     """
     Build a map of all exons across all transcripts of a gene.
     Assigns consistent exon numbers based on genomic position.
+    No requests are made; details come from filter_duplicate_transcripts.
     
     Args:
-        gene_data: Gene data from Ensembl
+        transcript_details: Transcript records (see parse_transcript_details); entries
+                            that are exceptions (failed lookups) are skipped
     
     Returns:
         Dict mapping exon_id to exon_number
@@ -129,51 +302,83 @@ def build_gene_exon_map(gene_data):
     print("\nBuilding gene-wide exon map...")
     
     # Collect all unique exons across all transcripts
-    all_exons = {}  # exon_id -> genomic position
+    all_exons = {}  # exon_id -> genomic start
     
-    transcripts = gene_data.get('Transcript', [])
-    for transcript in transcripts:
-        transcript_id = transcript.get('id')
-        try:
-            transcript_detail = get_transcript_details(transcript_id)
-            exons = transcript_detail.get('Exon', [])
-            
-            for exon in exons:
-                exon_id = exon.get('id')
-                if exon_id not in all_exons:
-                    # Store genomic position for sorting
-                    all_exons[exon_id] = {
-                        'start': exon.get('start'),
-                        'end': exon.get('end'),
-                        'id': exon_id
-                    }
-            
-            time.sleep(0.3)  # Be nice to API
-            
-        except Exception as e:
-            print(f"  Warning: Could not process transcript {transcript_id}: {e}")
+    for transcript_detail in transcript_details:
+        if isinstance(transcript_detail, Exception):
+            print(f"  Warning: Could not process transcript: {transcript_detail}")
             continue
+        
+        for exon in transcript_detail.exons:
+            if exon.id not in all_exons:
+                # Store genomic position for sorting
+                all_exons[exon.id] = exon.start
     
-    # Sort exons by genomic position
-    sorted_exons = sorted(all_exons.values(), key=lambda e: e['start'])
+    # Sort exon IDs by genomic position (dict lookup as key avoids a Python-level lambda)
+    sorted_ids = sorted(all_exons, key=all_exons.__getitem__)
     
     # Assign numbers
-    exon_number_map = {}
-    for i, exon in enumerate(sorted_exons, 1):
-        exon_number_map[exon['id']] = i
+    exon_number_map = {exon_id: i for i, exon_id in enumerate(sorted_ids, 1)}
     
     print(f"  Found {len(exon_number_map)} unique exons across all transcripts")
     
     return exon_number_map
 
-def find_cds_in_transcript(transcript_detail, transcript_seq):
+def find_cds_in_transcript(transcript_detail, transcript_seq, verify_cds=False, log=print):
     """
     Find the CDS (coding sequence) boundaries within the transcript.
     CDS starts at ATG (start codon) and ends at stop codon.
     
+    Uses the Translation coordinates already present in the transcript lookup,
+    mapped through the exon table, so no extra request is needed.
+    
+    Args:
+        transcript_detail: Transcript record (see parse_transcript_details)
+        transcript_seq: Full transcript sequence
+        verify_cds: Also locate the CDS from Ensembl's CDS sequence and
+                    prefer that result if the two disagree (a failed lookup
+                    only warns; it never discards the coordinate result)
+        log: Callable that receives warning lines
+    
+    Returns:
+        Dict with cds_start, cds_end positions in transcript (0-based)
+    """
+    cds_info = None
+    exons = transcript_detail.exons
+    
+    if transcript_detail.translation_start is not None and exons:
+        cds_range = translation_cdna_range([(e.start, e.end) for e in exons], transcript_detail.strand,
+                                           transcript_detail.translation_start,
+                                           transcript_detail.translation_end)
+        
+        if cds_range is None:
+            log(f"  Warning: Translation lies outside the transcript's exons")
+        elif transcript_seq[cds_range[0]:cds_range[0] + 3].upper() != 'ATG':
+            log(f"  Warning: CDS doesn't start with ATG: {transcript_seq[cds_range[0]:cds_range[0] + 10].upper()}")
+        else:
+            cds_info = {
+                'cds_start': cds_range[0],
+                'cds_end': cds_range[1]
+            }
+    
+    if verify_cds:
+        seq_info = find_cds_by_sequence(transcript_detail, transcript_seq, log)
+        if seq_info != cds_info:
+            log(f"  Warning: CDS from coordinates {cds_info} doesn't match CDS sequence {seq_info}")
+            if seq_info is not None:
+                return seq_info
+    
+    return cds_info
+
+def find_cds_by_sequence(transcript_detail, transcript_seq, log=print):
+    """
+    Locate the CDS by downloading it from Ensembl and searching for it in the
+    transcript. Slower than find_cds_in_transcript; used by --verify-cds.
+    
     Args:
-        transcript_detail: Transcript details from Ensembl
+        transcript_detail: Transcript record (see parse_transcript_details)
         transcript_seq: Full transcript sequence
+        log: Callable that receives warning lines
     
     Returns:
         Dict with cds_start, cds_end positions in transcript (0-based)
@@ -182,7 +387,7 @@ def find_cds_in_transcript(transcript_detail, transcript_seq):
     
     # Get CDS sequence from Ensembl
     try:
-        cds_seq = get_sequence(transcript_detail.get('id'), "cds")
+        cds_seq = get_sequence(transcript_detail.id, "cds")
         if not cds_seq:
             return None
         
@@ -191,36 +396,33 @@ def find_cds_in_transcript(transcript_detail, transcript_seq):
         
         # The CDS should start with ATG
         if not cds_seq_upper.startswith('ATG'):
-            print(f"  Warning: CDS doesn't start with ATG: {cds_seq_upper[:10]}")
+            log(f"  Warning: CDS doesn't start with ATG: {cds_seq_upper[:10]}")
             return None
         
-        # Find where this CDS appears in the transcript
-        # Search for the CDS start (first ~50 bp) to locate it precisely
-        search_length = min(50, cds_length)
-        cds_start_pattern = cds_seq_upper[:search_length]
-        
-        cds_start = transcript_seq_upper.find(cds_start_pattern)
+        # Find where this CDS appears in the transcript. Searching for the whole
+        # CDS (no prefix slice) means a hit is already a full, verified match.
+        cds_start = transcript_seq_upper.find(cds_seq_upper)
         if cds_start == -1:
-            print(f"  Warning: Could not locate CDS in transcript")
+            log(f"  Warning: Could not locate CDS in transcript")
             return None
         
         cds_end = cds_start + cds_length
         
-        # Verify the match
-        if transcript_seq_upper[cds_start:cds_end] == cds_seq_upper:
-            return {
-                'cds_start': cds_start,
-                'cds_end': cds_end
-            }
-        else:
-            print(f"  Warning: CDS sequence doesn't match transcript")
-            return None
+        # Cheap sanity check on the stop codon instead of re-comparing the whole CDS
+        if transcript_seq_upper[cds_end - 3:cds_end] not in STOP_CODONS:
+            log(f"  Warning: CDS doesn't end with a stop codon")
+        
+        return {
+            'cds_start': cds_start,
+            'cds_end': cds_end
+        }
             
     except Exception as e:
-        print(f"  Warning: Could not get CDS: {e}")
+        log(f"  Warning: Could not get CDS: {e}")
         return None
 
-def annotate_transcript_features(transcript_detail, transcript_seq, exon_number_map):
+def annotate_transcript_features(transcript_detail, transcript_seq, exon_number_map, verify_cds=False,
+                                 log=print):
     """
     Identify and annotate all features in a transcript:
     - 5' UTR
@@ -228,9 +430,11 @@ def annotate_transcript_features(transcript_detail, transcript_seq, exon_number_
     - 3' UTR
     
     Args:
-        transcript_detail: Transcript details from Ensembl
+        transcript_detail: Transcript record (see parse_transcript_details)
         transcript_seq: Full transcript sequence
         exon_number_map: Dict mapping exon_id to consistent exon number
+        verify_cds: Cross-check CDS boundaries against Ensembl's CDS sequence
+        log: Callable that receives warning lines
     
     Returns:
         List of feature dicts with type, start, end, label
@@ -238,7 +442,7 @@ def annotate_transcript_features(transcript_detail, transcript_seq, exon_number_
     features = []
     
     # Get CDS boundaries
-    cds_info = find_cds_in_transcript(transcript_detail, transcript_seq)
+    cds_info = find_cds_in_transcript(transcript_detail, transcript_seq, verify_cds, log)
     
     if not cds_info:
         # Non-coding transcript, just annotate as single feature
@@ -265,49 +469,46 @@ def annotate_transcript_features(transcript_detail, transcript_seq, exon_number_
         })
     
     # Now get the exons and figure out which parts are coding
-    exons = transcript_detail.get('Exon', [])
-    sorted_exons = sorted(exons, key=lambda e: e.get('start'))
-    
-    # Calculate exon positions in transcript
-    current_pos = 0
+    # (transcript order: reversed genomic order on the minus strand)
+    sorted_exons = sorted(transcript_detail.exons, key=lambda e: e.start,
+                          reverse=(transcript_detail.strand == -1))
+    
+    # Calculate exon positions in transcript once, as cumulative lengths
+    # (exon length comes straight from its coordinates, no sequence fetch needed)
+    exon_lengths = [e.end - e.start + 1 for e in sorted_exons]
+    exon_tx_ends = list(accumulate(exon_lengths))
     coding_exons_found = []
     
-    for exon in sorted_exons:
-        exon_id = exon.get('id')
-        try:
-            exon_seq = get_sequence(exon_id, "genomic")
-            exon_length = len(exon_seq)
-            
-            exon_start = current_pos
-            exon_end = current_pos + exon_length
-            
-            # Check if this exon overlaps with CDS
-            if exon_end > cds_start and exon_start < cds_end:
-                # This exon contains coding sequence
-                # Calculate the coding portion
-                coding_start = max(exon_start, cds_start)
-                coding_end = min(exon_end, cds_end)
-                
-                # Get the consistent exon number from the map
-                exon_number = exon_number_map.get(exon_id, '?')
-                
-                # Choose color based on exon number (not sequential position)
-                color_idx = (exon_number - 1) % len(FEATURE_COLORS['exon'])
-                
-                coding_exons_found.append({
-                    'type': 'misc_feature',
-                    'label': f'exon{exon_number}',
-                    'start': coding_start,
-                    'end': coding_end,
-                    'color': FEATURE_COLORS['exon'][color_idx],
-                    'exon_number': exon_number
-                })
-            
-            current_pos = exon_end
-            
-        except Exception as e:
-            print(f"  Warning: Could not process exon {exon_id}: {e}")
+    # Skip straight to the first exon ending past the CDS start, stop once past the CDS end
+    for idx in range(bisect_right(exon_tx_ends, cds_start), len(sorted_exons)):
+        exon_end = exon_tx_ends[idx]
+        exon_start = exon_end - exon_lengths[idx]
+        if exon_start >= cds_end:
+            break
+        
+        # Get the consistent exon number from the map
+        exon_id = sorted_exons[idx].id
+        exon_number = exon_number_map.get(exon_id)
+        if exon_number is None:
+            log(f"  Warning: Exon {exon_id} missing from gene exon map, skipping")
             continue
+        
+        # This exon contains coding sequence
+        # Calculate the coding portion
+        coding_start = max(exon_start, cds_start)
+        coding_end = min(exon_end, cds_end)
+        
+        # Choose color based on exon number (not sequential position)
+        color_idx = (exon_number - 1) % len(FEATURE_COLORS['exon'])
+        
+        coding_exons_found.append({
+            'type': 'misc_feature',
+            'label': f'exon{exon_number}',
+            'start': coding_start,
+            'end': coding_end,
+            'color': FEATURE_COLORS['exon'][color_idx],
+            'exon_number': exon_number
+        })
     
     # Add coding exons to features
     features.extend(coding_exons_found)
@@ -377,6 +578,25 @@ def create_genbank_record(gene_symbol, transcript_name, transcript_seq, features
     
     return record
 
+def format_origin(seq_bytes):
+    """
+    Format a sequence as the body of a GenBank ORIGIN block.
+    
+    Args:
+        seq_bytes: Sequence as uppercase ASCII bytes
+    
+    Returns:
+        Bytes with 60 bp per line in groups of 10, each line prefixed by its
+        1-based position
+    """
+    # Split into 10 bp groups once, then join six groups per line
+    groups = [seq_bytes[j:j+10] for j in range(0, len(seq_bytes), 10)]
+    lines = [b"%9d " % (k * 10 + 1) + b' '.join(groups[k:k+6])
+             for k in range(0, len(groups), 6)]
+    if not lines:
+        return b""
+    return b"\n".join(lines) + b"\n"
+
 def write_genbank_file(record, output_path):
     """
     Write SeqRecord to GenBank file with ApEinfo formatting.
@@ -385,121 +605,38 @@ def write_genbank_file(record, output_path):
         record: SeqRecord object
         output_path: Output file path
     """
-    with open(output_path, 'w') as f:
+    with open(output_path, 'wb') as f:
         # Write manually to ensure ApEinfo comment is included
-        f.write(f"LOCUS       {record.name:<20}{len(record.seq):>6} bp    DNA        linear       {record.annotations['date']}\n")
-        f.write("DEFINITION  .\n")
-        f.write("ACCESSION   \n")
-        f.write("VERSION     \n")
-        f.write("SOURCE      .\n")
-        f.write("  ORGANISM  .\n")
-        f.write("COMMENT     \n")
-        f.write("COMMENT     ApEinfo:methylated:1\n")
+        f.write(f"LOCUS       {record.name:<20}{len(record.seq):>6} bp    DNA        linear       {record.annotations['date']}\n".encode())
+        f.write(b"DEFINITION  .\n")
+        f.write(b"ACCESSION   \n")
+        f.write(b"VERSION     \n")
+        f.write(b"SOURCE      .\n")
+        f.write(b"  ORGANISM  .\n")
+        f.write(b"COMMENT     \n")
+        f.write(b"COMMENT     ApEinfo:methylated:1\n")
         
         # Write features
         if record.features:
-            f.write("FEATURES             Location/Qualifiers\n")
+            f.write(b"FEATURES             Location/Qualifiers\n")
             for feature in record.features:
                 # Write feature location (convert to 1-based)
                 start = feature.location.start + 1
                 end = feature.location.end
-                f.write(f"     {feature.type:<16}{start}..{end}\n")
+                f.write(f"     {feature.type:<16}{start}..{end}\n".encode())
                 
                 # Write qualifiers
                 for key, values in feature.qualifiers.items():
                     for value in values:
                         # Handle multi-line qualifiers
-                        f.write(f"                     /{key}=\"{value}\"\n")
-        
-        # Write sequence
-        f.write("ORIGIN\n")
-        seq_str = str(record.seq).upper()
-        for i in range(0, len(seq_str), 60):
-            line = seq_str[i:i+60]
-            # Format: 10 bp per group, 6 groups per line
-            formatted = ' '.join([line[j:j+10] for j in range(0, len(line), 10)])
-            f.write(f"{i+1:>9} {formatted}\n")
+                        f.write(f"                     /{key}=\"{value}\"\n".encode())
         
-        f.write("//\n")
+        # Write sequence as a single pre-formatted buffer
+        f.write(b"ORIGIN\n")
+        f.write(format_origin(bytes(record.seq).upper()))
+        f.write(b"//\n")
 
-def generate_audit_report(gene_data, gene_symbol, species, transcripts_kept, 
-                         transcripts_filtered, exon_map, features_by_transcript, output_files):
-    """Generate concise audit report with verification links"""
-    
-    gene_id = gene_data.get('id')
-    gene_name = gene_data.get('display_name')
-    chrom = gene_data.get('seq_region_name')
-    start = gene_data.get('start')
-    end = gene_data.get('end')
-    
-    lines = []
-    lines.append(f"GENE EXTRACTION AUDIT - {gene_symbol}")
-    lines.append("=" * 80)
-    lines.append(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
-    lines.append(f"Gene: {gene_id} | Location: chr{chrom}:{start:,}-{end:,}")
-    lines.append(f"Verify: https://ensembl.org/Danio_rerio/Gene/Summary?g={gene_id}")
-    lines.append("")
-    
-    # Transcript decisions
-    lines.append("TRANSCRIPTS")
-    lines.append("-" * 80)
-    for t in transcripts_kept:
-        tid = t.get('id')
-        tname = t.get('display_name')
-        canon = " [CANONICAL]" if t.get('is_canonical') else ""
-        lines.append(f"✅ KEPT: {tname}{canon}")
-        lines.append(f"   https://ensembl.org/Danio_rerio/Transcript/Exons?t={tid}")
-    
-    for f in transcripts_filtered:
-        reason = f.get('reason', 'unknown')
-        lines.append(f"❌ FILTERED: {f['name']} - {reason}")
-    
-    lines.append("")
-    
-    # Features for each transcript
-    lines.append("FEATURES ANNOTATED")
-    lines.append("-" * 80)
-    for transcript_name, features in features_by_transcript.items():
-        lines.append(f"\n{transcript_name}:")
-        for feat in features:
-            label = feat['label']
-            start = feat['start'] + 1
-            end = feat['end']
-            lines.append(f"  {label:<10} {start:>5}-{end:<5} ({end-start+1} bp)")
-    
-    lines.append("")
-    
-    # Validation checklist
-    lines.append("VALIDATION CHECKLIST")
-    lines.append("-" * 80)
-    lines.append("[ ] Transcript count matches Ensembl")
-    lines.append("[ ] Exon boundaries match links above")
-    lines.append("[ ] Output looks correct in APE")
-    lines.append("")
-    
-    # Methodology
-    lines.append("METHODOLOGY (for papers)")
-    lines.append("-" * 80)
-    lines.append(f"Gene sequences extracted using Gene Builder")
-    lines.append(f"(github.com/USERNAME/gene-builder) from Ensembl Release 110.")
-    lines.append(f"Species: {species}. CDS boundaries from Ensembl annotations.")
-    lines.append(f"Exon numbering based on genomic position across variants.")
-    lines.append("")
-    
-    # Output files
-    lines.append("OUTPUT FILES")
-    lines.append("-" * 80)
-    for outfile in output_files:
-        with open(outfile['path'], 'rb') as f:
-            md5 = hashlib.md5(f.read()).hexdigest()[:8]
-        lines.append(f"{outfile['filename']} ({outfile['sequence_length']} bp, MD5:{md5})")
-    
-    lines.append("")
-    lines.append(f"Report generated: {datetime.now().isoformat()}")
-    
-    return '\n'.join(lines)
-
-def filter_duplicate_transcripts(gene_data, canonical_only=False):
+def filter_duplicate_transcripts(gene_data, canonical_only=False, details_by_id=None):
     """
     Filter out transcripts that are duplicates or subsets of other transcripts.
     Keeps the longest/most complete transcript when duplicates are found.
@@ -507,14 +644,20 @@ def filter_duplicate_transcripts(gene_data, canonical_only=False):
     Args:
         gene_data: Gene data from Ensembl
         canonical_only: If True, only keep canonical transcript(s)
+        details_by_id: Optional pre-fetched Transcript records (see
+                       parse_transcript_details); fetched here when not given
     
     Returns:
-        List of transcript dicts to keep, list of filtered transcript info
+        List of kept transcript info (dicts with the 'transcript' summary and its
+        already-fetched 'detail'), list of filtered transcript info
     """
     transcripts = gene_data.get('Transcript', [])
+    if details_by_id is None:
+        details_by_id = parse_transcript_details(
+            get_transcript_details_many([t.get('id') for t in transcripts]))
     
     if len(transcripts) <= 1:
-        return transcripts, []
+        return [{'transcript': t, 'detail': details_by_id[t.get('id')]} for t in transcripts], []
     
     print("\n" + "="*80)
     print("Filtering duplicate/subset transcripts...")
@@ -524,38 +667,55 @@ def filter_duplicate_transcripts(gene_data, canonical_only=False):
     transcript_info = []
     for transcript in transcripts:
         transcript_id = transcript.get('id')
-        try:
-            detail = get_transcript_details(transcript_id)
-            exons = detail.get('Exon', [])
-            exon_ids = set(exon.get('id') for exon in exons)
-            
-            # Get genomic span
-            start = transcript.get('start')
-            end = transcript.get('end')
-            span = end - start if start and end else 0
-            
-            transcript_info.append({
-                'transcript': transcript,
-                'detail': detail,
-                'id': transcript_id,
-                'name': transcript.get('display_name'),
-                'exon_ids': exon_ids,
-                'exon_count': len(exon_ids),
-                'start': start,
-                'end': end,
-                'span': span,
-                'is_canonical': transcript.get('is_canonical', False)
-            })
-            
-            time.sleep(0.3)
-        except Exception as e:
-            print(f"  Warning: Could not analyze transcript {transcript_id}: {e}")
+        detail = details_by_id[transcript_id]
+        if isinstance(detail, Exception):
+            print(f"  Warning: Could not analyze transcript {transcript_id}: {detail}")
             continue
+        
+        exon_ids = frozenset(exon.id for exon in detail.exons)
+        
+        # Get genomic span
+        start = transcript.get('start')
+        end = transcript.get('end')
+        span = end - start if start and end else 0
+        
+        transcript_info.append({
+            'transcript': transcript,
+            'detail': detail,
+            'id': transcript_id,
+            'name': transcript.get('display_name'),
+            'exon_ids': exon_ids,
+            'exon_count': len(exon_ids),
+            'start': start,
+            'end': end,
+            'span': span,
+            'is_canonical': transcript.get('is_canonical', False)
+        })
     
     # Filter duplicates/subsets
     to_keep = []
     filtered = []
     
+    # A transcript's span is the min/max of its exon coordinates, so any transcript
+    # containing another (as an exon superset or genomically) starts no later and
+    # ends no earlier. Sort once by (start, -end) and only scan that prefix.
+    by_span = sorted(range(len(transcript_info)),
+                     key=lambda k: (transcript_info[k]['start'], -transcript_info[k]['end']))
+    span_keys = [(transcript_info[k]['start'], -transcript_info[k]['end']) for k in by_span]
+    
+    # Transcripts with identical exon sets hash into the same bucket; keep one per
+    # bucket (the canonical one if present) instead of letting them filter each other
+    by_exon_set = {}
+    for k, info in enumerate(transcript_info):
+        by_exon_set.setdefault(info['exon_ids'], []).append(k)
+    duplicate_of = {}  # index -> index of the kept transcript with the same exons
+    for bucket in by_exon_set.values():
+        if len(bucket) > 1:
+            keeper = next((k for k in bucket if transcript_info[k]['is_canonical']), bucket[0])
+            for k in bucket:
+                if k != keeper:
+                    duplicate_of[k] = keeper
+    
     for i, info_i in enumerate(transcript_info):
         should_filter = False
         filter_reason = None
@@ -567,43 +727,43 @@ def filter_duplicate_transcripts(gene_data, canonical_only=False):
             filter_reason = 'non_canonical'
             filter_details = {'note': 'Canonical-only mode enabled'}
         
-        for j, info_j in enumerate(transcript_info):
-            if i == j:
-                continue
-            
-            # Check 1: Exon set subset (transcript i's exons are subset of j's)
-            if info_i['exon_ids'].issubset(info_j['exon_ids']):
-                # i is a subset of j
-                # Keep j (the superset) unless i is canonical and j is not
-                if not info_i['is_canonical'] or info_j['is_canonical']:
-                    should_filter = True
-                    filter_reason = 'exon_subset'
-                    filter_details = {
-                        'superset': info_j['name'],
-                        'exons_this': info_i['exon_count'],
-                        'exons_super': info_j['exon_count']
-                    }
+        match = (duplicate_of[i], 'exact_duplicate') if i in duplicate_of else None
+        if match is None:
+            # Only transcripts that start no later and end no earlier can contain this
+            # one; scan those in the original order and report the first superset
+            candidates = sorted(by_span[:bisect_right(span_keys, (info_i['start'], -info_i['end']))])
+            for j in candidates:
+                info_j = transcript_info[j]
+                if j == i or j in duplicate_of or info_j['end'] < info_i['end']:
+                    continue
+                
+                # Keep the canonical transcript over a non-canonical superset
+                if info_i['is_canonical'] and not info_j['is_canonical']:
+                    continue
+                
+                # Check 1: Exon set subset (transcript i's exons are subset of j's)
+                if info_i['exon_ids'].issubset(info_j['exon_ids']):
+                    match = (j, 'exon_subset')
                     break
-            
-            # Check 2: Genomic containment (transcript i is fully contained in j's genomic span)
-            # AND i has fewer exons (suggesting it's a partial transcript)
-            if (info_i['start'] >= info_j['start'] and 
-                info_i['end'] <= info_j['end'] and 
-                info_i['exon_count'] < info_j['exon_count']):
-                # i is genomically contained within j and has fewer exons
-                # Keep j unless i is canonical and j is not
-                if not info_i['is_canonical'] or info_j['is_canonical']:
-                    should_filter = True
-                    filter_reason = 'genomic_subset'
-                    filter_details = {
-                        'superset': info_j['name'],
-                        'exons_this': info_i['exon_count'],
-                        'exons_super': info_j['exon_count'],
-                        'span_this': info_i['span'],
-                        'span_super': info_j['span']
-                    }
+                # Check 2: Genomic containment (already guaranteed by the span bounds)
+                # AND i has fewer exons (suggesting it's a partial transcript)
+                elif info_i['exon_count'] < info_j['exon_count']:
+                    match = (j, 'genomic_subset')
                     break
         
+        if match:
+            j, filter_reason = match
+            info_j = transcript_info[j]
+            should_filter = True
+            filter_details = {
+                'superset': info_j['name'],
+                'exons_this': info_i['exon_count'],
+                'exons_super': info_j['exon_count']
+            }
+            if filter_reason == 'genomic_subset':
+                filter_details['span_this'] = info_i['span']
+                filter_details['span_super'] = info_j['span']
+        
         if should_filter:
             filtered.append({
                 'name': info_i['name'],
@@ -617,6 +777,9 @@ def filter_duplicate_transcripts(gene_data, canonical_only=False):
                 print(f"     Reason: Non-canonical transcript (canonical-only mode)")
                 print(f"     Exons: {info_i['exon_count']}")
                 print(f"     Genomic span: {info_i['start']}-{info_i['end']} ({info_i['span']:,} bp)")
+            elif filter_reason == 'exact_duplicate':
+                print(f"     Reason: Same exons as {filter_details['superset']}")
+                print(f"     Exons: {filter_details['exons_this']}")
             elif filter_reason == 'exon_subset':
                 print(f"     Reason: Exon subset of {filter_details['superset']}")
                 print(f"     This has {filter_details['exons_this']} exons, superset has {filter_details['exons_super']} exons")
@@ -626,7 +789,7 @@ def filter_duplicate_transcripts(gene_data, canonical_only=False):
                 print(f"     Superset: {info_j['start']}-{info_j['end']} ({filter_details['span_super']:,} bp, {filter_details['exons_super']} exons)")
                 print(f"     Likely a partial/truncated transcript")
         else:
-            to_keep.append(info_i['transcript'])
+            to_keep.append(info_i)
             print(f"\n  ✓ KEEPING: {info_i['name']}")
             print(f"     Exons: {info_i['exon_count']}")
             print(f"     Genomic span: {info_i['start']}-{info_i['end']} ({info_i['span']:,} bp)")
@@ -639,7 +802,81 @@ def filter_duplicate_transcripts(gene_data, canonical_only=False):
     
     return to_keep, filtered
 
-def process_gene(gene_symbol, species="danio_rerio", output_dir="output", canonical_only=False):
+def _process_transcript(transcript, transcript_detail, gene_symbol, exon_number_map, run_output_dir,
+                        verify_cds=False, transcript_seq=None):
+    """
+    Fetch, annotate and write the GenBank file for one transcript.
+    Progress lines are buffered and printed as one block, so transcripts
+    processed concurrently don't interleave their output.
+    
+    Args:
+        transcript: Transcript summary from the gene lookup
+        transcript_detail: Transcript record (see parse_transcript_details)
+        gene_symbol: Gene symbol
+        exon_number_map: Dict mapping exon_id to consistent exon number
+        run_output_dir: Directory to write the GenBank file into
+        verify_cds: Cross-check CDS boundaries against Ensembl's CDS sequence
+        transcript_seq: cDNA sequence if already fetched (see get_sequences_batch);
+                        fetched here when not given
+    
+    Returns:
+        Tuple of (generated file info dict, list of feature dicts)
+    """
+    transcript_id = transcript.get('id')
+    transcript_name = transcript.get('display_name')
+    
+    lines = [f"\n{'='*80}", f"Processing: {transcript_name} ({transcript_id})"]
+    if transcript.get('is_canonical', False):
+        lines.append("  [CANONICAL TRANSCRIPT]")
+    
+    # Print the buffer even on failure, so an error shows which transcript it came from
+    try:
+        # Detailed transcript info was fetched up front
+        if isinstance(transcript_detail, Exception):
+            raise transcript_detail
+        
+        # Get transcript sequence (normally fetched for all transcripts in one batch)
+        if not transcript_seq:
+            lines.append("  Fetching transcript sequence...")
+            transcript_seq = get_sequence(transcript_id, "cdna")
+        lines.append(f"  Transcript length: {len(transcript_seq)} bp")
+        
+        # Annotate features (5'UTR, exons, 3'UTR)
+        lines.append("  Identifying features (5'UTR, exons, 3'UTR)...")
+        # Warnings go into the same buffer so they stay inside this transcript's block
+        features = annotate_transcript_features(transcript_detail, transcript_seq, exon_number_map,
+                                                verify_cds=verify_cds, log=lines.append)
+        
+        lines.append(f"  Found {len(features)} features:")
+        for feat in features:
+            lines.append(f"    {feat['label']}: {feat['start']}-{feat['end']} ({feat['end']-feat['start']} bp)")
+        
+        # Create GenBank record
+        lines.append("  Creating GenBank record...")
+        record = create_genbank_record(gene_symbol, transcript_name, transcript_seq, features)
+        
+        # Write to file
+        output_filename = f"{gene_symbol}_{transcript_name}.gbk"
+        output_path = os.path.join(run_output_dir, output_filename)
+        lines.append(f"  Writing to {output_path}...")
+        write_genbank_file(record, output_path)
+        lines.append(f"  ✓ Complete!")
+    finally:
+        with _print_lock:
+            print("\n".join(lines))
+    
+    file_info = {
+        'path': output_path,
+        'filename': output_filename,
+        'transcript_name': transcript_name,
+        'transcript_id': transcript_id,
+        'sequence_length': len(transcript_seq),
+        'feature_count': len(features)
+    }
+    return file_info, features
+
+def process_gene(gene_symbol, species="danio_rerio", output_dir="output", canonical_only=False,
+                 verify_cds=False):
     """
     Process a gene and generate GenBank files for all splice variants.
     
@@ -648,6 +885,7 @@ def process_gene(gene_symbol, species="danio_rerio", output_dir="output", canoni
         species: Species name
         output_dir: Output directory for GenBank files
         canonical_only: Only process canonical transcript(s)
+        verify_cds: Cross-check CDS boundaries against Ensembl's CDS sequence
     
     Returns:
         List of generated file paths
@@ -673,68 +911,48 @@ def process_gene(gene_symbol, species="danio_rerio", output_dir="output", canoni
     all_transcripts = gene_data.get('Transcript', [])
     print(f"\nFound {len(all_transcripts)} transcript(s) in Ensembl")
     
+    # Fetch details (exons, translation) for every transcript in one batch request,
+    # shared by the filter, the exon map and the main loop
+    transcript_ids = [t.get('id') for t in all_transcripts]
+    try:
+        details_by_id = lookup_ids_batch(transcript_ids)
+    except Exception as e:
+        print(f"  Warning: Batch transcript lookup failed ({e}), fetching individually")
+        details_by_id = get_transcript_details_many(transcript_ids)
+    details_by_id = parse_transcript_details(details_by_id)
+    
     # Filter duplicates/subsets
-    transcripts, filtered_info = filter_duplicate_transcripts(gene_data, canonical_only=canonical_only)
+    kept_info, filtered_info = filter_duplicate_transcripts(gene_data, canonical_only=canonical_only,
+                                                            details_by_id=details_by_id)
+    transcripts = [info['transcript'] for info in kept_info]
     
     # Build gene-wide exon numbering map (using filtered transcripts)
-    gene_data['Transcript'] = transcripts  # Update gene data with filtered list
-    exon_number_map = build_gene_exon_map(gene_data)
+    exon_number_map = build_gene_exon_map(info['detail'] for info in kept_info)
     
     generated_files = []
     features_by_transcript = {}  # For audit report
     
-    for transcript in transcripts:
-        transcript_id = transcript.get('id')
-        transcript_name = transcript.get('display_name')
-        is_canonical = transcript.get('is_canonical', False)
-        
-        print(f"\n{'='*80}")
-        print(f"Processing: {transcript_name} ({transcript_id})")
-        if is_canonical:
-            print("  [CANONICAL TRANSCRIPT]")
-        
-        # Get detailed transcript info
-        print("  Fetching transcript details...")
-        transcript_detail = get_transcript_details(transcript_id)
-        
-        # Get transcript sequence
-        print("  Fetching transcript sequence...")
-        transcript_seq = get_sequence(transcript_id, "cdna")
-        print(f"  Transcript length: {len(transcript_seq)} bp")
-        
-        # Annotate features (5'UTR, exons, 3'UTR)
-        print("  Identifying features (5'UTR, exons, 3'UTR)...")
-        features = annotate_transcript_features(transcript_detail, transcript_seq, exon_number_map)
-        
-        print(f"  Found {len(features)} features:")
-        for feat in features:
-            print(f"    {feat['label']}: {feat['start']}-{feat['end']} ({feat['end']-feat['start']} bp)")
-        
-        # Store for audit report
-        features_by_transcript[transcript_name] = features
-        
-        # Create GenBank record
-        print("  Creating GenBank record...")
-        record = create_genbank_record(gene_symbol, transcript_name, transcript_seq, features)
-        
-        # Write to file
-        output_filename = f"{gene_symbol}_{transcript_name}.gbk"
-        output_path = os.path.join(run_output_dir, output_filename)
-        print(f"  Writing to {output_path}...")
-        write_genbank_file(record, output_path)
-        
-        generated_files.append({
-            'path': output_path,
-            'filename': output_filename,
-            'transcript_name': transcript_name,
-            'transcript_id': transcript_id,
-            'sequence_length': len(transcript_seq),
-            'feature_count': len(features)
-        })
-        print(f"  ✓ Complete!")
-        
-        # Be nice to the API
-        time.sleep(0.5)
+    # Fetch every kept transcript's cDNA with batched POSTs; any transcript the batch
+    # misses (or all of them, if it fails) is fetched individually by its worker
+    kept_ids = [info['transcript'].get('id') for info in kept_info]
+    try:
+        cdna_by_id = get_sequences_batch(kept_ids, "cdna")
+    except Exception as e:
+        print(f"  Warning: Batch sequence fetch failed ({e}), fetching individually")
+        cdna_by_id = {}
+    
+    # Transcripts are independent and I/O-bound; the shared SESSION and
+    # RATE_LIMITER keep concurrent requests within Ensembl's limits
+    with ThreadPoolExecutor(max_workers=MAX_TRANSCRIPT_WORKERS) as executor:
+        futures = [executor.submit(_process_transcript, info['transcript'], info['detail'], gene_symbol,
+                                   exon_number_map, run_output_dir, verify_cds,
+                                   cdna_by_id.get(transcript_id))
+                   for info, transcript_id in zip(kept_info, kept_ids)]
+        # Collect in the original transcript order
+        for future in futures:
+            file_info, features = future.result()
+            features_by_transcript[file_info['transcript_name']] = features  # For audit report
+            generated_files.append(file_info)
     
     # Generate audit report
     print(f"\n{'='*80}")
@@ -742,8 +960,7 @@ def process_gene(gene_symbol, species="danio_rerio", output_dir="output", canoni
     audit_content = generate_audit_report(
         gene_data, gene_symbol, species, 
         transcripts, filtered_info, 
-        exon_number_map, features_by_transcript, 
-        generated_files
+        features_by_transcript, generated_files
     )
     
     audit_filename = f"{gene_symbol}_audit_report.txt"
@@ -777,6 +994,16 @@ def main():
         action="store_true",
         help="Only output the canonical transcript (filters all non-canonical variants)"
     )
+    parser.add_argument(
+        "--verify-cds",
+        action="store_true",
+        help="Cross-check CDS boundaries against Ensembl's CDS sequence (one extra request per transcript)"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Clear cached Ensembl responses and fetch everything fresh"
+    )
     
     args = parser.parse_args()
     
@@ -785,12 +1012,16 @@ def main():
     print("Alternative Splicing-Aware Exon Numbering")
     print("="*80)
     
+    if args.no_cache:
+        clear_cache()
+    
     try:
         generated_files = process_gene(
             args.gene_symbol,
             args.species,
             args.output_dir,
-            args.canonical_only
+            args.canonical_only,
+            verify_cds=args.verify_cds
         )
         
         print("\n" + "="*80)
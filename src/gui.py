@@ -9,18 +9,70 @@ No command line needed!
 """
 
 import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox, filedialog
+from tkinter import ttk, messagebox
+from tkinter import font as tkfont
 import threading
+import queue
+import subprocess
 import sys
 import os
+from contextlib import redirect_stdout
 
-# Add parent directory to path for config
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+# Add parent directory to path for config (once, even if imported alongside other src/ modules)
+_parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if _parent_dir not in sys.path:
+    sys.path.insert(0, _parent_dir)
 
 # Import our config and main script
 import config
 from src.gene_to_genbank import process_gene
 
+# Species offered in the GUI: (Ensembl species code, common name)
+SPECIES_CHOICES = (
+    ('danio_rerio', 'Zebrafish'),
+    ('homo_sapiens', 'Human'),
+    ('mus_musculus', 'Mouse'),
+    ('rattus_norvegicus', 'Rat'),
+)
+SPECIES_DISPLAY = tuple(f'{code} ({name})' for code, name in SPECIES_CHOICES)
+SPECIES_MAP = {f'{code} ({name})': code for code, name in SPECIES_CHOICES}  # display -> code
+
+# How often (ms) the main thread applies updates queued by the worker thread
+UI_POLL_MS = 50
+
+# Oldest log lines are trimmed beyond this, so inserts don't slow down as the log grows
+MAX_LOG_LINES = 5000
+
+# Scrolling to the end is the costly part of appending; do it at most this often (ms)
+SEE_THROTTLE_MS = 100
+
+class _QueueWriter:
+    """File-like stdout replacement that streams complete lines onto the UI queue as log messages."""
+    
+    def __init__(self, ui_queue):
+        self.ui_queue = ui_queue
+        self.buf = ''
+        # process_gene prints from several worker threads
+        self.lock = threading.Lock()
+        
+    def write(self, s):
+        with self.lock:
+            self.buf += s
+            while '\n' in self.buf:
+                line, self.buf = self.buf.split('\n', 1)
+                self.ui_queue.put(('log', line))
+        return len(s)
+        
+    def flush(self):
+        pass
+        
+    def close(self):
+        """Emit any trailing partial line"""
+        with self.lock:
+            if self.buf:
+                self.ui_queue.put(('log', self.buf))
+                self.buf = ''
+
 class GeneBuilderGUI:
     def __init__(self, root):
         self.root = root
@@ -30,9 +82,30 @@ class GeneBuilderGUI:
         # Allow resizing
         self.root.resizable(True, True)
         
+        # Worker threads must not touch Tk; they queue ('log' | 'done' | 'error', payload)
+        # messages that _pump_ui applies on the main thread
+        self._ui_q = queue.Queue()
+        self._see_pending = False
+        
+        # One persistent daemon worker runs queued extractions one at a time, off the
+        # main thread; being a daemon, it never holds the process open after the window closes
+        self._jobs = queue.Queue()
+        threading.Thread(target=self._worker_loop, daemon=True).start()
+        
+        # Resolved once; used for the final log line and "Open Output Folder"
+        self._output_abs = os.path.abspath(config.OUTPUT_DIR)
+        
         self.create_widgets()
+        self.root.after(UI_POLL_MS, self._pump_ui)
         
     def create_widgets(self):
+        # Named fonts, created once and shared by the widgets below
+        self.f_title = tkfont.Font(family='Helvetica', size=24, weight='bold')
+        self.f_subtitle = tkfont.Font(family='Helvetica', size=12)
+        self.f_label = tkfont.Font(family='Helvetica', size=13, weight='bold')
+        self.f_input = tkfont.Font(family='Helvetica', size=13)
+        self.f_mono = tkfont.Font(family='Monaco', size=11)
+        
         # Main container to hold everything with padding
         container = ttk.Frame(self.root, padding="20")
         container.pack(fill=tk.BOTH, expand=True)
@@ -45,11 +118,11 @@ class GeneBuilderGUI:
         title_frame = ttk.Frame(container)
         title_frame.grid(row=0, column=0, columnspan=2, sticky="ew", pady=(0, 20))
         
-        title = ttk.Label(title_frame, text="🧬 Gene Builder", font=('Helvetica', 24, 'bold'))
+        title = ttk.Label(title_frame, text="🧬 Gene Builder", font=self.f_title)
         title.pack()
         
         subtitle = ttk.Label(title_frame, text="Extract gene sequences from Ensembl", 
-                            font=('Helvetica', 12))
+                            font=self.f_subtitle)
         subtitle.pack(pady=(5, 0))
         
         # Input Area
@@ -58,26 +131,21 @@ class GeneBuilderGUI:
         input_frame.columnconfigure(1, weight=1)
         
         # Gene Symbol
-        ttk.Label(input_frame, text="Gene Symbol:", font=('Helvetica', 13, 'bold')).grid(
+        ttk.Label(input_frame, text="Gene Symbol:", font=self.f_label).grid(
             row=0, column=0, sticky="w", pady=10)
         
-        self.gene_entry = ttk.Entry(input_frame, font=('Helvetica', 13))
+        self.gene_entry = ttk.Entry(input_frame, font=self.f_input)
         self.gene_entry.grid(row=0, column=1, sticky="ew", padx=(15, 0), pady=10)
         self.gene_entry.insert(0, "lrfn1")
         
         # Species
-        ttk.Label(input_frame, text="Species:", font=('Helvetica', 13, 'bold')).grid(
+        ttk.Label(input_frame, text="Species:", font=self.f_label).grid(
             row=1, column=0, sticky="w", pady=10)
         
         self.species_var = tk.StringVar(value=config.DEFAULT_SPECIES)
         species_combo = ttk.Combobox(input_frame, textvariable=self.species_var, 
-                                     font=('Helvetica', 13), state='readonly')
-        species_combo['values'] = (
-            'danio_rerio (Zebrafish)',
-            'homo_sapiens (Human)',
-            'mus_musculus (Mouse)',
-            'rattus_norvegicus (Rat)'
-        )
+                                     font=self.f_input, state='readonly')
+        species_combo['values'] = SPECIES_DISPLAY
         species_combo.current(0)
         species_combo.grid(row=1, column=1, sticky="ew", padx=(15, 0), pady=10)
         
@@ -100,10 +168,22 @@ class GeneBuilderGUI:
         log_frame.columnconfigure(0, weight=1)
         log_frame.rowconfigure(0, weight=1)
         
-        self.log_text = scrolledtext.ScrolledText(log_frame, width=60, height=10, 
-                                                  font=('Monaco', 11), wrap=tk.WORD)
+        # No word wrap: Tk re-runs line breaking on every insert and resize otherwise
+        # Plain Text + ttk scrollbars (ScrolledText only adds a wrapper Frame);
+        # the log is write-only, so skip undo bookkeeping on every insert
+        self.log_text = tk.Text(log_frame, width=60, height=10, 
+                                font=self.f_mono, wrap=tk.NONE,
+                                undo=False, autoseparators=False, maxundo=0)
         self.log_text.grid(row=0, column=0, sticky="nsew")
         
+        log_yscroll = ttk.Scrollbar(log_frame, orient=tk.VERTICAL, command=self.log_text.yview)
+        log_yscroll.grid(row=0, column=1, sticky="ns")
+        self.log_text.configure(yscrollcommand=log_yscroll.set)
+        
+        log_xscroll = ttk.Scrollbar(log_frame, orient=tk.HORIZONTAL, command=self.log_text.xview)
+        log_xscroll.grid(row=1, column=0, sticky="ew")
+        self.log_text.configure(xscrollcommand=log_xscroll.set)
+        
         # Progress bar
         self.progress = ttk.Progressbar(container, mode='indeterminate')
         self.progress.grid(row=5, column=0, columnspan=2, sticky="ew", pady=(15, 5))
@@ -118,10 +198,67 @@ class GeneBuilderGUI:
                   command=self.clear_log).pack(side=tk.LEFT, padx=10)
         
     def log(self, message):
-        """Add message to log"""
-        self.log_text.insert(tk.END, message + "\n")
+        """Queue message for the log (safe to call from any thread)"""
+        self._ui_q.put(('log', message))
+        
+    def _pump_ui(self):
+        """Apply queued worker updates on the main thread, then reschedule"""
+        messages = []
+        finished = None
+        try:
+            while True:
+                kind, payload = self._ui_q.get_nowait()
+                if kind == 'log':
+                    messages.append(payload)
+                else:
+                    finished = (kind, payload)
+                    break
+        except queue.Empty:
+            pass
+        
+        # All pending log lines go in with a single insert
+        if messages:
+            self.log_text.insert(tk.END, "\n".join(messages) + "\n")
+            total = int(self.log_text.index('end-1c').split('.')[0])
+            if total > MAX_LOG_LINES:
+                self.log_text.delete('1.0', f'{total - MAX_LOG_LINES}.0')
+            self._schedule_see()
+        
+        if finished:
+            self._extract_finished(*finished)
+        
+        self.root.after(UI_POLL_MS, self._pump_ui)
+        
+    def _schedule_see(self):
+        """Scroll the log to the end soon, coalescing requests into one see() per SEE_THROTTLE_MS"""
+        if not self._see_pending:
+            self._see_pending = True
+            self.root.after(SEE_THROTTLE_MS, self._do_see)
+        
+    def _do_see(self):
+        """Scroll the log to the end (scheduled by _schedule_see)"""
+        self._see_pending = False
         self.log_text.see(tk.END)
-        self.root.update()
+        
+    def _extract_finished(self, kind, payload):
+        """Reset the controls and report the outcome of an extraction (main thread)"""
+        # Stop progress bar and re-enable button
+        self.progress.stop()
+        self.extract_btn.config(state='normal')
+        
+        if kind == 'done':
+            messagebox.showinfo(
+                "Success!",
+                f"Generated {len(payload)} GenBank file(s)\n\n"
+                f"Files are in the output folder.\n"
+                f"You can open them in ApE or SnapGene."
+            )
+        else:
+            messagebox.showerror(
+                "Error",
+                f"Failed to extract gene:\n\n{payload}\n\n"
+                "Check the log for details."
+            )
         
     def clear_log(self):
         """Clear the log"""
@@ -135,91 +272,69 @@ class GeneBuilderGUI:
             messagebox.showwarning("Input Required", "Please enter a gene symbol")
             return
         
+        # Get species code for the selected display name
+        species = SPECIES_MAP[self.species_var.get()]
+        
+        canonical_only = self.canonical_var.get()
+        
         # Start progress bar
         self.progress.start(10) # Speed up animation
         self.extract_btn.config(state='disabled')
         self.clear_log()
         
-        # Run in background thread
-        thread = threading.Thread(target=self._extract_thread, args=(gene,))
-        thread.daemon = True
-        thread.start()
+        # Run in background thread (Tk variables are read above, on the main thread)
+        self._jobs.put((gene, species, canonical_only))
         
-    def _extract_thread(self, gene):
-        """Background thread for extraction"""
+    def _worker_loop(self):
+        """Run queued extraction jobs for the lifetime of the app"""
+        while True:
+            self._extract_thread(*self._jobs.get())
+        
+    def _extract_thread(self, gene, species, canonical_only):
+        """Background thread for extraction; reports back only through self._ui_q"""
         try:
-            # Get species code (remove display name)
-            species_full = self.species_var.get()
-            species = species_full.split(' ')[0]
-            
-            canonical_only = self.canonical_var.get()
-            
             self.log(f"🔍 Extracting gene: {gene}")
             self.log(f"📊 Species: {species}")
             self.log(f"🎯 Canonical only: {canonical_only}")
             self.log("-" * 60)
             
-            # Redirect stdout to capture print statements
-            import io
-            from contextlib import redirect_stdout
+            # Redirect stdout so print statements stream into the log as they happen
+            log_writer = _QueueWriter(self._ui_q)
+            try:
+                with redirect_stdout(log_writer):
+                    files = process_gene(
+                        gene, 
+                        species=species,
+                        output_dir=config.OUTPUT_DIR,
+                        canonical_only=canonical_only
+                    )
+            finally:
+                log_writer.close()
             
-            log_capture = io.StringIO()
-            
-            with redirect_stdout(log_capture):
-                files = process_gene(
-                    gene, 
-                    species=species,
-                    output_dir=config.OUTPUT_DIR,
-                    canonical_only=canonical_only
-                )
-            
-            # Show captured log
-            for line in log_capture.getvalue().split('\n'):
-                if line.strip():
-                    self.log(line)
-            
-            self.log("-" * 60)
-            self.log(f"✅ Success! Generated {len(files)} file(s):")
+            # Build the summary as one message so it lands in a single insert
+            summary = ["-" * 60, f"✅ Success! Generated {len(files)} file(s):"]
             if files:
                 # Extract directory from the first file path for display
                 output_subdir = os.path.dirname(files[0]['path'])
-                self.log(f"📁 Output folder: {os.path.basename(output_subdir)}")
-                
-            for f in files:
-                self.log(f"   📄 {f['filename']}")
-            self.log("")
-            self.log(f"💾 Files saved to: {os.path.abspath(config.OUTPUT_DIR)}")
+                summary.append(f"📁 Output folder: {os.path.basename(output_subdir)}")
+            summary.extend(f"   📄 {f['filename']}" for f in files)
+            summary.append("")
+            summary.append(f"💾 Files saved to: {self._output_abs}")
+            self.log("\n".join(summary))
             
             # Show success message
-            self.root.after(0, lambda: messagebox.showinfo(
-                "Success!",
-                f"Generated {len(files)} GenBank file(s)\n\n"
-                f"Files are in the output folder.\n"
-                f"You can open them in ApE or SnapGene."
-            ))
+            self._ui_q.put(('done', files))
             
         except Exception as e:
             self.log(f"❌ Error: {str(e)}")
-            
-            # Capture the error string immediately to avoid closure issues
-            error_msg = str(e)
-            
-            self.root.after(0, lambda msg=error_msg: messagebox.showerror(
-                "Error",
-                f"Failed to extract gene:\n\n{msg}\n\n"
-                "Check the log for details."
-            ))
-        finally:
-            # Stop progress bar and re-enable button
-            self.root.after(0, self.progress.stop)
-            self.root.after(0, lambda: self.extract_btn.config(state='normal'))
+            self._ui_q.put(('error', str(e)))
     
     def open_output(self):
         """Open output folder in Finder"""
-        import subprocess
-        output_path = os.path.abspath(config.OUTPUT_DIR)
-        if os.path.exists(output_path):
-            subprocess.call(['open', output_path])
+        if os.path.exists(self._output_abs):
+            # Popen returns immediately, so a slow Finder launch can't freeze the window
+            subprocess.Popen(['open', self._output_abs], stdin=subprocess.DEVNULL,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, close_fds=True)
         else:
             messagebox.showinfo("Info", "Output folder is empty. Extract a gene first!")
 